@@ -1,15 +1,178 @@
+import errno
 import os
 import re
 import shutil
+import sys
 from datetime import datetime
+from functools import lru_cache
+from operator import attrgetter
 from pathlib import Path
-from typing import Any, Callable, Dict, List
+from typing import Any, Callable, Dict, List, NamedTuple, Pattern, Set, Union
 
 from jupyter_core.application import JupyterApp
-from traitlets import Int, Unicode
+from traitlets import Int, Unicode, observe
 
 from ._version import __version__
 
+# Backup filenames are prefixed with a fixed-width timestamp: YYYY-MM-DD_HH-MM-SS_
+_TIMESTAMP_LEN = 19
+_TIMESTAMP_PATTERN = r"[0-9]{4}-[0-9]{2}-[0-9]{2}_[0-9]{2}-[0-9]{2}-[0-9]{2}"
+
+# Errors raised by copy_file_range when the kernel cannot copy between two files
+_COPY_FALLBACK_ERRNOS = frozenset(
+    {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP}
+)
+
+
+@lru_cache(maxsize=256)
+def _compile_backup_pattern(filename: str) -> Pattern[str]:
+    """Compile a pattern matching the backup names of a notebook.
+
+    The filename is embedded in the pattern, so a single match checks both the
+    timestamp prefix and the notebook name. Patterns are cached, as the same
+    notebook is usually saved many times.
+
+    Args:
+        filename: Original notebook filename.
+
+    Returns:
+        Pattern matching names of the form YYYY-MM-DD_HH-MM-SS_{filename}.
+    """
+    return re.compile(_TIMESTAMP_PATTERN + "_" + re.escape(filename) + r"\Z")
+
+
+def _relative_to(path: str, root: str) -> str:
+    """Compute a path relative to a root directory, like Path.relative_to on strings.
+
+    Args:
+        path: Path inside root.
+        root: Root directory.
+
+    Returns:
+        The relative path, or an empty string if path is root itself.
+
+    Raises:
+        ValueError: If path is not inside root.
+    """
+    if path == root:
+        return ""
+    prefix = root if root.endswith(os.sep) else root + os.sep
+    if path.startswith(prefix):
+        return path[len(prefix) :]
+    # Not a plain string prefix (e.g. root is not normalized), let pathlib decide
+    relative_path = Path(path).relative_to(root)
+    return os.fspath(relative_path) if relative_path.parts else ""
+
+
+def _parse_timestamp(timestamp: str) -> datetime:
+    """Parse a backup timestamp of the form YYYY-MM-DD_HH-MM-SS.
+
+    Equivalent to datetime.strptime(timestamp, "%Y-%m-%d_%H-%M-%S"), but reads the
+    fixed-width fields directly instead of interpreting a format string.
+
+    Args:
+        timestamp: Timestamp string as used in backup filenames.
+
+    Returns:
+        The parsed datetime.
+    """
+    return datetime(
+        int(timestamp[0:4]),
+        int(timestamp[5:7]),
+        int(timestamp[8:10]),
+        int(timestamp[11:13]),
+        int(timestamp[14:16]),
+        int(timestamp[17:19]),
+    )
+
+
+def _format_timestamp(timestamp: datetime) -> str:
+    """Format a datetime as a backup timestamp of the form YYYY-MM-DD_HH-MM-SS.
+
+    Equivalent to timestamp.strftime("%Y-%m-%d_%H-%M-%S") without going through
+    the format string machinery.
+
+    Args:
+        timestamp: The datetime to format.
+
+    Returns:
+        Timestamp string as used in backup filenames.
+    """
+    t = timestamp
+    return f"{t.year:04d}-{t.month:02d}-{t.day:02d}_{t.hour:02d}-{t.minute:02d}-{t.second:02d}"
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, size: int) -> bool:
+    """Copy a file with os.copy_file_range until the end of the source file.
+
+    Args:
+        src_fd: File descriptor to copy from, positioned at the start of the file.
+        dst_fd: File descriptor to copy to, positioned at the start of the file.
+        size: Size of the source file.
+
+    Returns:
+        True if the file was copied, False if the kernel cannot copy between these
+        files. Nothing has been written in the latter case.
+    """
+    blocksize = max(size, 2**20)
+    copied = 0
+    while True:
+        try:
+            sent = os.copy_file_range(src_fd, dst_fd, blocksize)
+        except OSError as e:
+            if copied == 0 and e.errno in _COPY_FALLBACK_ERRNOS:
+                return False
+            raise
+        if sent == 0:
+            # Some filesystems report 0 bytes copied instead of an error
+            return copied > 0 or size == 0
+        copied += sent
+
+
+def _fast_copy(src: str, dst: str) -> None:
+    """Copy a file including its metadata, like shutil.copy2.
+
+    On Linux the content is copied in the kernel with copy_file_range, which can share
+    extents on filesystems supporting reflinks. On other platforms, or if the kernel
+    cannot copy between the two files, shutil.copy2 is used, which already picks the
+    platform's fast copy (sendfile on Linux, fcopyfile on macOS).
+
+    Args:
+        src: Path of the file to copy.
+        dst: Path of the copy.
+    """
+    if sys.platform.startswith("linux") and hasattr(os, "copy_file_range"):
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            src_fd = fsrc.fileno()
+            copied = _copy_file_range(src_fd, fdst.fileno(), os.fstat(src_fd).st_size)
+        if copied:
+            shutil.copystat(src, dst)
+            return
+    shutil.copy2(src, dst)
+
+
+def _file_size(path: str) -> int:
+    """Get the size of a file in bytes.
+
+    Args:
+        path: Path of the file.
+
+    Returns:
+        The size of the file, or 0 if it no longer exists or is a dangling symlink.
+    """
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
+
+
+class _Backup(NamedTuple):
+    """A backup file found in a backup directory."""
+
+    # Fixed-width YYYY-MM-DD_HH-MM-SS, so string order is chronological order
+    timestamp: str
+    path: str
+
 
 class E2xBackupApp(JupyterApp):
     """Jupyter application for backing up notebooks to a local directory.
@@ -62,6 +225,26 @@ class E2xBackupApp(JupyterApp):
     )
     backup_dir = Unicode(".backup", config=True, help="Directory to store backups in")
 
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        # Backup directories already created (or found) by this app, to skip mkdir on each save
+        self._ensured_dirs: Set[str] = set()
+        self._update_disabled()
+        self._update_backup_dir()
+
+    @observe("max_backup_files", "max_backup_size_mb")
+    def _update_disabled(self, change: Any = None) -> None:
+        """Cache whether backups are disabled, so backup() does not re-check the limits."""
+        self._disabled = self.max_backup_files == 0 or self.max_backup_size_mb == 0
+        if self._disabled and change is not None:
+            self.log.info("Backup disabled")
+
+    @observe("backup_dir")
+    def _update_backup_dir(self, change: Any = None) -> None:
+        """Cache the expanded backup_dir, so backup() does not re-expand it on each save."""
+        self._full_backup_dir = os.path.expanduser(os.path.expandvars(self.backup_dir))
+        self._backup_dir_is_absolute = os.path.isabs(self._full_backup_dir)
+
     def list_backups(self, backup_dir: Path, filename: str) -> List[Path]:
         """List all backup files for a given notebook filename.
 
@@ -75,20 +258,35 @@ class E2xBackupApp(JupyterApp):
         Returns:
             List of Path objects pointing to backup files, unsorted.
         """
-        if not backup_dir.exists():
+        return [Path(backup.path) for backup in self._scan_backups(backup_dir, filename)]
+
+    def _scan_backups(self, backup_dir: Union[str, Path], filename: str) -> List[_Backup]:
+        """Scan a backup directory for the backups of a notebook.
+
+        Only the directory is read, the backups are not stat-ed. Timestamps are kept as
+        strings, only the overwrite decision needs to parse them, and only for the two
+        newest backups.
+
+        Args:
+            backup_dir: Directory containing backup files.
+            filename: Original notebook filename to find backups for.
+
+        Returns:
+            List of backups, sorted from newest to oldest.
+        """
+        pattern = _compile_backup_pattern(filename)
+        try:
+            entries = os.scandir(backup_dir)
+        except FileNotFoundError:
             return []
-        # First find all files that end in filename
-        candidate_files = backup_dir.glob(f"*{filename}")
-        # Timestamp pattern
-        timestamp_pattern = re.compile(r"^\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}$")
-        # Filter everything based on the timestamps
-        backup_files = []
-        for candidate_file in candidate_files:
-            # Remove filename and trailing underscore to isolate the timestamp part
-            part = candidate_file.name[: -len(filename) - 1]
-            if timestamp_pattern.match(part):
-                backup_files.append(candidate_file)
-        return backup_files
+        with entries:
+            backups = [
+                _Backup(entry.name[:_TIMESTAMP_LEN], entry.path)
+                for entry in entries
+                if pattern.match(entry.name)
+            ]
+        backups.sort(key=attrgetter("timestamp"), reverse=True)
+        return backups
 
     def prune_old_backups(self, backup_dir: Path, filename: str) -> None:
         """Remove old backup files exceeding the maximum count.
@@ -101,21 +299,30 @@ class E2xBackupApp(JupyterApp):
             backup_dir: Directory containing backup files.
             filename: Original notebook filename to prune backups for.
         """
-        backup_files = sorted(self.list_backups(backup_dir, filename), reverse=True)
-        remaining_backups = backup_files
+        self._prune_old_backups(self._scan_backups(backup_dir, filename))
+
+    def _prune_old_backups(self, backups: List[_Backup]) -> None:
+        """Remove old backup files exceeding the maximum count or total size.
+
+        Args:
+            backups: Backups of a single notebook, sorted from newest to oldest.
+        """
+        remaining_backups = backups
         if self.max_backup_files > 0:
-            remaining_backups = backup_files[: self.max_backup_files]
-            for old_backup in backup_files[self.max_backup_files :]:
-                old_backup.unlink()
-                self.log.info(f"Deleted old backup {old_backup}")
+            remaining_backups = backups[: self.max_backup_files]
+            for old_backup in backups[self.max_backup_files :]:
+                os.unlink(old_backup.path)
+                self.log.info(f"Deleted old backup {old_backup.path}")
         if self.max_backup_size_mb > 0:
-            total_size_mb = sum(f.stat().st_size for f in remaining_backups) / (1024 * 1024)
-            while total_size_mb > self.max_backup_size_mb and remaining_backups:
+            # Sizes are only needed here, so backups are stat-ed only for size pruning
+            sizes = [_file_size(backup.path) for backup in remaining_backups]
+            max_size = self.max_backup_size_mb * 1024 * 1024
+            total_size = sum(sizes)
+            while total_size > max_size and remaining_backups:
                 oldest_backup = remaining_backups.pop()
-                oldest_size_mb = oldest_backup.stat().st_size / (1024 * 1024)
-                oldest_backup.unlink()
-                self.log.info(f"Deleted old backup {oldest_backup} to reduce total size")
-                total_size_mb -= oldest_size_mb
+                total_size -= sizes.pop()
+                os.unlink(oldest_backup.path)
+                self.log.info(f"Deleted old backup {oldest_backup.path} to reduce total size")
 
     def should_overwrite_backup(self, backup_dir: Path, filename: str, timestamp: datetime) -> bool:
         """Decide whether a new backup should overwrite the most recent backup.
@@ -160,19 +367,88 @@ class E2xBackupApp(JupyterApp):
         Returns:
             True if the new backup should overwrite the most recent backup, False otherwise.
         """
-        existing_backups = sorted(self.list_backups(backup_dir, filename), reverse=True)
+        existing_backups = self._scan_backups(backup_dir, filename)
+        return self._should_overwrite_backup(existing_backups, timestamp)
+
+    def _should_overwrite_backup(
+        self, existing_backups: List[_Backup], timestamp: datetime
+    ) -> bool:
+        """Decide whether a new backup should overwrite the most recent backup.
+
+        See should_overwrite_backup for the strategy.
+
+        Args:
+            existing_backups: Backups of the notebook, sorted from newest to oldest.
+            timestamp: Current timestamp when the backup is being considered.
+
+        Returns:
+            True if the new backup should overwrite the most recent backup, False otherwise.
+        """
         if len(existing_backups) < 2:
             return False
-        latest_backup = existing_backups[0].name.replace(filename, "")[:-1]
-        second_latest_backup = existing_backups[1].name.replace(filename, "")[:-1]
-        latest_time = datetime.strptime(latest_backup, "%Y-%m-%d_%H-%M-%S")
+        latest_time = _parse_timestamp(existing_backups[0].timestamp)
         if (timestamp - latest_time).total_seconds() > self.min_seconds_between_backups:
             return False
-        second_latest_time = datetime.strptime(second_latest_backup, "%Y-%m-%d_%H-%M-%S")
+        second_latest_time = _parse_timestamp(existing_backups[1].timestamp)
         if (latest_time - second_latest_time).total_seconds() < self.min_seconds_between_backups:
             return True
         return False
 
+    def _copy_backup(self, os_path: str, backup_dir: str, backup_path: str) -> None:
+        """Copy a notebook to its backup path, recreating the backup directory if needed.
+
+        Backup directories are only created once per app, so the directory may have been
+        removed since (e.g. by a user cleaning up their backups).
+
+        Args:
+            os_path: Absolute filesystem path to the notebook being saved.
+            backup_dir: Directory containing backup files.
+            backup_path: Path of the new backup file.
+        """
+        try:
+            _fast_copy(os_path, backup_path)
+        except FileNotFoundError:
+            if os.path.isdir(backup_dir):
+                raise
+            os.makedirs(backup_dir, exist_ok=True)
+            _fast_copy(os_path, backup_path)
+
+    def _replace_backups(
+        self, os_path: str, backup_dir: str, filename: str, backup_path: str, timestamp: str
+    ) -> None:
+        """Create a backup that replaces all previous backups of a notebook.
+
+        Shortcut for max_backup_files == 1. Only the new backup is kept, so there is no
+        overwrite decision to make and nothing to sort, and the previous backups are
+        deleted without being stat-ed.
+
+        Args:
+            os_path: Absolute filesystem path to the notebook being saved.
+            backup_dir: Directory containing backup files.
+            filename: Original notebook filename.
+            backup_path: Path of the new backup file.
+            timestamp: Timestamp of the new backup.
+        """
+        pattern = _compile_backup_pattern(filename)
+        try:
+            entries = os.scandir(backup_dir)
+        except FileNotFoundError:
+            # The backup directory was removed, _copy_backup recreates it
+            old_backups = []
+        else:
+            with entries:
+                old_backups = [entry.path for entry in entries if pattern.match(entry.name)]
+
+        self._copy_backup(os_path, backup_dir, backup_path)
+        self.log.info(f"Backed up {os_path} to {backup_path}")
+
+        for old_backup in old_backups:
+            os.unlink(old_backup)
+            self.log.info(f"Deleted old backup {old_backup}")
+        # The size limit still applies to the new backup
+        if self.max_backup_size_mb > 0:
+            self._prune_old_backups([_Backup(timestamp, backup_path)])
+
     def backup(self, model: Dict[str, Any], os_path: str, contents_manager: Any) -> None:
         """Create a timestamped backup of a notebook file.
 
@@ -193,46 +469,52 @@ class E2xBackupApp(JupyterApp):
             os_path: Absolute filesystem path to the notebook being saved.
             contents_manager: Jupyter ContentsManager instance with root_dir attribute.
         """
-        if model["type"] != "notebook":
-            return
-        if self.max_backup_files == 0 or self.max_backup_size_mb == 0:
-            self.log.info("Backup disabled")
+        if model.get("type") != "notebook" or self._disabled:
             return
 
         try:
-            full_backup_dir = Path(os.path.expandvars(self.backup_dir)).expanduser()
-
+            # Paths are handled as plain strings here, this runs on every save
             notebook_parent_dir, filename = os.path.split(os_path)
 
             # Determine backup directory path based on whether backup_dir is absolute or relative
-            if full_backup_dir.is_absolute():
-                relative_path = Path(notebook_parent_dir).relative_to(contents_manager.root_dir)
-                backup_dir = full_backup_dir / relative_path
+            if self._backup_dir_is_absolute:
+                relative_path = _relative_to(notebook_parent_dir, contents_manager.root_dir)
+                backup_dir = self._full_backup_dir
+                if relative_path:
+                    backup_dir = os.path.join(backup_dir, relative_path)
             else:
-                backup_dir = Path(notebook_parent_dir) / full_backup_dir
+                backup_dir = os.path.join(notebook_parent_dir, self._full_backup_dir)
 
-            backup_dir.mkdir(parents=True, exist_ok=True)  # Ensure backup directory exists
+            # Ensure backup directory exists
+            if backup_dir not in self._ensured_dirs:
+                os.makedirs(backup_dir, exist_ok=True)
+                self._ensured_dirs.add(backup_dir)
 
             current_time = datetime.now()
-            timestamp_str = current_time.strftime("%Y-%m-%d_%H-%M-%S")
+            timestamp_str = _format_timestamp(current_time)
             backup_filename = f"{timestamp_str}_{filename}"
-            backup_path = backup_dir / backup_filename
+            backup_path = os.path.join(backup_dir, backup_filename)
 
             # Skip backup if it already exists for this timestamp
-            if backup_path.exists():
+            if os.path.lexists(backup_path):
                 return
 
-            if self.should_overwrite_backup(backup_dir, filename, current_time):
+            if self.max_backup_files == 1:
+                self._replace_backups(os_path, backup_dir, filename, backup_path, timestamp_str)
+                return
+
+            # Scan the backup directory once and reuse the result for all decisions below
+            existing_backups = self._scan_backups(backup_dir, filename)
+
+            if self._should_overwrite_backup(existing_backups, current_time):
                 self.log.info("Overwriting the most recent backup due to minimum interval setting.")
-                # Get the most recent backup file and unlink it
-                existing_backups = sorted(self.list_backups(backup_dir, filename), reverse=True)
-                existing_backups[0].unlink()
+                os.unlink(existing_backups.pop(0).path)
 
-            shutil.copy2(os_path, backup_path)
+            self._copy_backup(os_path, backup_dir, backup_path)
             self.log.info(f"Backed up {os_path} to {backup_path}")
 
-            # Prune old backups
-            self.prune_old_backups(backup_dir, filename)
+            # Prune old backups, the new backup is the most recent one
+            self._prune_old_backups([_Backup(timestamp_str, backup_path)] + existing_backups)
         except Exception as e:
             self.log.error(f"Failed to create backup for {os_path}: {e}")
 
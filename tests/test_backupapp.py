@@ -1,6 +1,12 @@
+import errno
+import os
+import shutil
+import sys
 from datetime import datetime
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import Mock, patch
+
+import pytest
 
 
 class TestE2xBackupApp:
@@ -14,7 +20,7 @@ class TestE2xBackupApp:
             # Set a fixed current time for testing
             fixed_time = datetime(2024, 1, 1, 12, 0, 0)
             mock_datetime.now.return_value = fixed_time
-            mock_datetime.strptime.side_effect = lambda s, fmt: datetime.strptime(s, fmt)
+            mock_datetime.side_effect = datetime
 
             backup_app.max_backup_files = 1  # Limit to 1 backup for testing
             backup_app.backup(notebook_model, str(sample_notebook), mock_contents_manager)
@@ -28,7 +34,7 @@ class TestE2xBackupApp:
             # Set a fixed current time for testing
             fixed_time = datetime(2024, 1, 1, 13, 0, 0)
             mock_datetime.now.return_value = fixed_time
-            mock_datetime.strptime.side_effect = lambda s, fmt: datetime.strptime(s, fmt)
+            mock_datetime.side_effect = datetime
             backup_app.backup(notebook_model, str(sample_notebook), mock_contents_manager)
 
             backup_files = backup_app.list_backups(
@@ -39,6 +45,72 @@ class TestE2xBackupApp:
                 "2024-01-01_13-00-00_test_notebook.ipynb"
             )  # Should be the new backup
 
+    def test_backup_limit_one_keeps_backups_of_other_notebooks(
+        self, backup_app, notebook_model, sample_notebook, mock_contents_manager
+    ):
+        """Test that replacing the single backup leaves other notebooks' backups alone."""
+        backup_dir = Path(mock_contents_manager.root_dir) / ".backup"
+        backup_dir.mkdir()
+        other_backup = backup_dir / "2024-01-01_11-00-00_other_notebook.ipynb"
+        other_backup.touch()
+        (backup_dir / "2024-01-01_11-00-00_test_notebook.ipynb").touch()
+
+        backup_app.max_backup_files = 1
+        backup_app.backup(notebook_model, str(sample_notebook), mock_contents_manager)
+
+        backup_files = backup_app.list_backups(backup_dir, "test_notebook.ipynb")
+        assert len(backup_files) == 1
+        assert backup_files[0].name != "2024-01-01_11-00-00_test_notebook.ipynb"
+        assert other_backup.exists()
+
+    def test_backup_preserves_content_and_metadata(
+        self, backup_app, notebook_model, sample_notebook, mock_contents_manager
+    ):
+        """Test that a backup has the notebook's content and modification time."""
+        os.utime(sample_notebook, (1_700_000_000, 1_700_000_000))
+        backup_app.backup(notebook_model, str(sample_notebook), mock_contents_manager)
+        backup_files = backup_app.list_backups(
+            Path(mock_contents_manager.root_dir) / ".backup", "test_notebook.ipynb"
+        )
+        assert len(backup_files) == 1
+        assert backup_files[0].read_bytes() == sample_notebook.read_bytes()
+        assert backup_files[0].stat().st_mtime == sample_notebook.stat().st_mtime
+
+    def test_backup_falls_back_when_copy_file_range_is_unsupported(
+        self, backup_app, notebook_model, sample_notebook, mock_contents_manager
+    ):
+        """Test that backups are still created if the kernel cannot copy between the files."""
+        with patch.dict(os.__dict__):
+            os.copy_file_range = Mock(side_effect=OSError(errno.ENOSYS, "unsupported"))
+            backup_app.backup(notebook_model, str(sample_notebook), mock_contents_manager)
+        backup_files = backup_app.list_backups(
+            Path(mock_contents_manager.root_dir) / ".backup", "test_notebook.ipynb"
+        )
+        assert len(backup_files) == 1
+        assert backup_files[0].read_bytes() == sample_notebook.read_bytes()
+
+    @pytest.mark.parametrize("platform", ["linux", "darwin"])
+    def test_backup_without_copy_file_range(
+        self, backup_app, notebook_model, sample_notebook, mock_contents_manager, platform
+    ):
+        """Test backups where copy_file_range is missing and sendfile needs an offset (BSD)."""
+        real_sendfile = os.sendfile
+
+        def sendfile(out_fd, in_fd, offset, count):
+            if offset is None:
+                raise TypeError("an integer is required")
+            return real_sendfile(out_fd, in_fd, offset, count)
+
+        with patch.dict(os.__dict__), patch.object(sys, "platform", platform):
+            os.__dict__.pop("copy_file_range", None)
+            os.sendfile = sendfile
+            backup_app.backup(notebook_model, str(sample_notebook), mock_contents_manager)
+        backup_files = backup_app.list_backups(
+            Path(mock_contents_manager.root_dir) / ".backup", "test_notebook.ipynb"
+        )
+        assert len(backup_files) == 1
+        assert backup_files[0].read_bytes() == sample_notebook.read_bytes()
+
     def test_backup_with_non_notebook_file(self, backup_app, mock_contents_manager):
         """Test that non-notebook files are not backed up."""
         model = {"type": "file", "name": "test_file.txt"}
@@ -70,6 +142,19 @@ class TestE2xBackupApp:
         )
         assert len(backup_files) == 0  # No backups should be created when disabled
 
+    def test_backup_reenabled_after_being_disabled(
+        self, backup_app, notebook_model, sample_notebook, mock_contents_manager
+    ):
+        """Test that backups are created again once the limits are raised above 0."""
+        backup_app.max_backup_files = 0  # Disable backups
+        backup_app.backup(notebook_model, str(sample_notebook), mock_contents_manager)
+        backup_app.max_backup_files = 5  # Enable backups again
+        backup_app.backup(notebook_model, str(sample_notebook), mock_contents_manager)
+        backup_files = backup_app.list_backups(
+            Path(mock_contents_manager.root_dir) / ".backup", "test_notebook.ipynb"
+        )
+        assert len(backup_files) == 1
+
     def test_skip_backup_with_same_timestamp(
         self, backup_app, notebook_model, sample_notebook, mock_contents_manager
     ):
@@ -77,7 +162,7 @@ class TestE2xBackupApp:
         with patch("e2x_jupyter_backup.backup_app.datetime") as mock_datetime:
             fixed_time = datetime(2024, 1, 1, 12, 0, 0)
             mock_datetime.now.return_value = fixed_time
-            mock_datetime.strptime.side_effect = lambda s, fmt: datetime.strptime(s, fmt)
+            mock_datetime.side_effect = datetime
 
             backup_app.backup(notebook_model, str(sample_notebook), mock_contents_manager)
             backup_app.backup(notebook_model, str(sample_notebook), mock_contents_manager)
@@ -89,6 +174,27 @@ class TestE2xBackupApp:
                 "2024-01-01_12-00-00_test_notebook.ipynb"
             )  # Should be the new backup
 
+    @pytest.mark.parametrize("max_backup_files", [10, 1])
+    def test_backup_after_backup_dir_was_removed(
+        self, backup_app, notebook_model, sample_notebook, mock_contents_manager, max_backup_files
+    ):
+        """Test that a save right after the backup directory was removed is backed up."""
+        backup_app.max_backup_files = max_backup_files
+        backup_dir = Path(mock_contents_manager.root_dir) / ".backup"
+        with patch("e2x_jupyter_backup.backup_app.datetime") as mock_datetime:
+            mock_datetime.side_effect = datetime
+            mock_datetime.now.return_value = datetime(2024, 1, 1, 12, 0, 0)
+            backup_app.backup(notebook_model, str(sample_notebook), mock_contents_manager)
+            backup_files = backup_app.list_backups(backup_dir, "test_notebook.ipynb")
+            assert [f.name for f in backup_files] == ["2024-01-01_12-00-00_test_notebook.ipynb"]
+
+            shutil.rmtree(backup_dir)
+
+            mock_datetime.now.return_value = datetime(2024, 1, 1, 13, 0, 0)
+            backup_app.backup(notebook_model, str(sample_notebook), mock_contents_manager)
+            backup_files = backup_app.list_backups(backup_dir, "test_notebook.ipynb")
+            assert [f.name for f in backup_files] == ["2024-01-01_13-00-00_test_notebook.ipynb"]
+
     def test_prune_backups_by_file_count(
         self, backup_app, notebook_model, sample_notebook, mock_contents_manager
     ):
@@ -96,7 +202,7 @@ class TestE2xBackupApp:
         with patch("e2x_jupyter_backup.backup_app.datetime") as mock_datetime:
             base_time = datetime(2024, 1, 1, 12, 0, 0)
             mock_datetime.now.return_value = base_time
-            mock_datetime.strptime.side_effect = lambda s, fmt: datetime.strptime(s, fmt)
+            mock_datetime.side_effect = datetime
 
             backup_app.max_backup_files = 3
             for i in range(5):
@@ -128,7 +234,7 @@ class TestE2xBackupApp:
         with patch("e2x_jupyter_backup.backup_app.datetime") as mock_datetime:
             base_time = datetime(2024, 1, 1, 12, 0, 0)
             mock_datetime.now.return_value = base_time
-            mock_datetime.strptime.side_effect = lambda s, fmt: datetime.strptime(s, fmt)
+            mock_datetime.side_effect = datetime
 
             backup_app.max_backup_size_mb = 1
             backup_app.max_backup_files = -1  # No file count limit
@@ -155,7 +261,7 @@ class TestE2xBackupApp:
         with patch("e2x_jupyter_backup.backup_app.datetime") as mock_datetime:
             base_time = datetime(2024, 1, 1, 12, 0, 0)
             mock_datetime.now.return_value = base_time
-            mock_datetime.strptime.side_effect = lambda s, fmt: datetime.strptime(s, fmt)
+            mock_datetime.side_effect = datetime
 
             backup_app.min_seconds_between_backups = 5  # 5 seconds
             backup_app.backup(notebook_model, str(sample_notebook), mock_contents_manager)
@@ -201,7 +307,7 @@ class TestE2xBackupApp:
         with patch("e2x_jupyter_backup.backup_app.datetime") as mock_datetime:
             fixed_time = datetime(2024, 1, 1, 12, 0, 0)
             mock_datetime.now.return_value = fixed_time
-            mock_datetime.strptime.side_effect = lambda s, fmt: datetime.strptime(s, fmt)
+            mock_datetime.side_effect = datetime
 
             backup_app_with_absolute_backup_dir.backup(
                 notebook_model, str(sample_notebook), mock_contents_manager
@@ -211,3 +317,61 @@ class TestE2xBackupApp:
             )
             assert len(backup_files) == 1
             assert backup_files[0].name.startswith("2024-01-01_12-00-00_test_notebook.ipynb")
+
+    def test_list_backups_ignores_non_backup_files(self, backup_app, tmp_path):
+        """Test that only files following the backup naming pattern are listed."""
+        backup_dir = tmp_path / ".backup"
+        backup_dir.mkdir()
+        for name in [
+            "2024-01-01_12-00-00_test_notebook.ipynb",
+            "2024-01-01_12-00-00_other_test_notebook.ipynb",
+            "2024-01-01_12-00-0x_test_notebook.ipynb",
+            "2024-01-01-12-00-00_test_notebook.ipynb",
+            "copy_of_test_notebook.ipynb",
+            "test_notebook.ipynb",
+        ]:
+            (backup_dir / name).touch()
+
+        backup_files = backup_app.list_backups(backup_dir, "test_notebook.ipynb")
+        assert [f.name for f in backup_files] == ["2024-01-01_12-00-00_test_notebook.ipynb"]
+
+    def test_list_backups_with_dangling_symlink(self, backup_app, tmp_path):
+        """Test that a dangling symlink does not hide the other backups."""
+        backup_dir = tmp_path / ".backup"
+        backup_dir.mkdir()
+        (backup_dir / "2024-01-01_10-00-00_test_notebook.ipynb").symlink_to(tmp_path / "missing")
+        (backup_dir / "2024-01-01_11-00-00_test_notebook.ipynb").touch()
+
+        backup_files = backup_app.list_backups(backup_dir, "test_notebook.ipynb")
+        assert sorted(f.name for f in backup_files) == [
+            "2024-01-01_10-00-00_test_notebook.ipynb",
+            "2024-01-01_11-00-00_test_notebook.ipynb",
+        ]
+
+        backup_app.max_backup_files = 1
+        backup_app.max_backup_size_mb = 1
+        backup_app.prune_old_backups(backup_dir, "test_notebook.ipynb")
+        backup_files = backup_app.list_backups(backup_dir, "test_notebook.ipynb")
+        assert [f.name for f in backup_files] == ["2024-01-01_11-00-00_test_notebook.ipynb"]
+
+    def test_backup_with_absolute_backup_dir_preserves_subdirectory(
+        self,
+        backup_app_with_absolute_backup_dir,
+        notebook_model,
+        sample_notebook,
+        mock_contents_manager,
+    ):
+        """Test that the notebook's path below the root is kept in the absolute backup dir."""
+        subdir = sample_notebook.parent / "project" / "week1"
+        subdir.mkdir(parents=True)
+        notebook = subdir / sample_notebook.name
+        notebook.write_bytes(sample_notebook.read_bytes())
+
+        backup_app_with_absolute_backup_dir.backup(
+            notebook_model, str(notebook), mock_contents_manager
+        )
+        backup_files = backup_app_with_absolute_backup_dir.list_backups(
+            Path(backup_app_with_absolute_backup_dir.backup_dir) / "project" / "week1",
+            "test_notebook.ipynb",
+        )
+        assert len(backup_files) == 1